@@ -26,7 +26,6 @@ set -euo pipefail
 
 MAX_ITERATIONS="${1:-10}"
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-ROOT_DIR="$(cd "$SCRIPT_DIR/../.." && pwd)"
 
 # Use the understanding prompt by default (can be overridden)
 export PROMPT_FILE="${PROMPT_FILE:-$SCRIPT_DIR/understand_prompt.md}"
@@ -42,7 +41,7 @@ export ALLOWED_PATHS="${ALLOWED_PATHS-scripts/ralph/codebase_map.md}"
 export RALPH_BRANCH="${RALPH_BRANCH-ralph/understanding}"
 
 # Ensure the map file exists (create if missing)
-MAP_FILE="$ROOT_DIR/scripts/ralph/codebase_map.md"
+MAP_FILE="$SCRIPT_DIR/codebase_map.md"
 if [[ ! -f "$MAP_FILE" ]]; then
   cat >"$MAP_FILE" <<'EOF'
 # Codebase Map (Brownfield Notes)
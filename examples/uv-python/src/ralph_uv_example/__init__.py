@@ -2,9 +2,11 @@ from __future__ import annotations
 
 __all__ = ["greet"]
 
+_DEFAULT_GREETING = "Hello, world!"
+
 
 def greet(name: str) -> str:
     name = name.strip()
     if not name:
-        name = "world"
+        return _DEFAULT_GREETING
     return f"Hello, {name}!"
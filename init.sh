@@ -33,9 +33,9 @@ if [[ ! -d "$ROOT_DIR" ]]; then
   exit 2
 fi
 
-# Convert to absolute path and change into it
-ROOT_DIR="$(cd "$ROOT_DIR" && pwd)"
+# Change into it and take the absolute path from $PWD (one resolution, no subshell)
 cd "$ROOT_DIR"
+ROOT_DIR="$PWD"
 
 # Define paths to Ralph files (all relative to scripts/ralph/)
 RALPH_DIR="scripts/ralph"
@@ -272,34 +272,33 @@ EOF
 fi
 
 # -----------------------------------------------------------------------------
-# VALIDATE PRD JSON SYNTAX
+# VALIDATE PRD
 # -----------------------------------------------------------------------------
 
 ui_section "Validate PRD"
 
-# First pass: check if the file is valid JSON at all
-if ! python3 -m json.tool "$PRD_FILE" >/dev/null 2>&1; then
-  ui_err "Invalid JSON: $PRD_FILE"
-  exit 1
-fi
-ui_ok "JSON is valid: $PRD_FILE"
-
-# -----------------------------------------------------------------------------
-# VALIDATE PRD SCHEMA
-# -----------------------------------------------------------------------------
-# The PRD must conform to a strict schema. This Python script validates:
+# The PRD is parsed, validated and summarized by a single python3 run (one
+# read + one parse of prd.json). It exits 2 if the file is not valid JSON,
+# 1 with the schema errors on stdout, or 0 with the summary on stdout.
+#
+# The PRD must conform to a strict schema. The script validates:
 # - Top-level object has exactly "branchName" and "userStories" keys
 # - branchName is a non-empty string
 # - userStories is an array of story objects
 # - Each story has: id, title, acceptanceCriteria, priority, passes, notes
 # - All fields have correct types
 
-python3 - <<'PY' "$PRD_FILE"
+PRD_CHECK_RC=0
+PRD_CHECK_OUT="$(python3 - <<'PY' "$PRD_FILE"
 import json
 import sys
 
 path = sys.argv[1]
-data = json.load(open(path, "r", encoding="utf-8"))
+try:
+  with open(path, "r", encoding="utf-8") as f:
+    data = json.load(f)
+except (OSError, ValueError):
+  raise SystemExit(2)
 
 errors = []
 
@@ -347,26 +346,10 @@ else:
 
 # Report any validation errors
 if errors:
-  print("init.sh: prd.json schema errors:", file=sys.stderr)
+  print("init.sh: prd.json schema errors:")
   for e in errors:
-    print(f"- {e}", file=sys.stderr)
+    print(f"- {e}")
   raise SystemExit(1)
-PY
-
-# -----------------------------------------------------------------------------
-# PRINT STATUS SUMMARY
-# -----------------------------------------------------------------------------
-# Parse the PRD and display a summary of stories and their status
-
-ui_section "PRD summary"
-
-python3 - <<'PY' "$PRD_FILE" | ui_box
-import json
-import sys
-
-path = sys.argv[1]
-data = json.load(open(path, "r", encoding="utf-8"))
-stories = data.get("userStories", [])
 
 # Count how many stories are failing (passes == false)
 failing = sum(1 for s in stories if isinstance(s, dict) and s.get("passes") is False)
@@ -374,16 +357,35 @@ failing = sum(1 for s in stories if isinstance(s, dict) and s.get("passes") is F
 print(f"Branch: {data.get('branchName')}")
 print(f"Stories: total={len(stories)} failing={failing}")
 PY
+)" || PRD_CHECK_RC=$?
+
+# Anything other than a clean run or a schema failure means the JSON itself is bad
+if [[ "$PRD_CHECK_RC" != "0" && "$PRD_CHECK_RC" != "1" ]]; then
+  ui_err "Invalid JSON: $PRD_FILE"
+  exit 1
+fi
+ui_ok "JSON is valid: $PRD_FILE"
+
+if [[ "$PRD_CHECK_RC" == "1" ]]; then
+  printf '%s\n' "$PRD_CHECK_OUT" >&2
+  exit 1
+fi
+
+# -----------------------------------------------------------------------------
+# PRINT STATUS SUMMARY
+# -----------------------------------------------------------------------------
+
+ui_section "PRD summary"
+printf '%s\n' "$PRD_CHECK_OUT" | ui_box
 
 # -----------------------------------------------------------------------------
 # FINALIZE SETUP
 # -----------------------------------------------------------------------------
 
 # Make the loop scripts executable (ignore errors if chmod fails)
-chmod +x "$LOOP_FILE" >/dev/null 2>&1 || true
-chmod +x "ralph.sh" >/dev/null 2>&1 || true
-chmod +x "$UNDERSTAND_LOOP_FILE" >/dev/null 2>&1 || true
-chmod +x "ralph-understand.sh" >/dev/null 2>&1 || true
+# One chmod for all of them: it still processes every operand when some are
+# missing (e.g. no top-level copies), it just exits non-zero.
+chmod +x "$LOOP_FILE" "ralph.sh" "$UNDERSTAND_LOOP_FILE" "ralph-understand.sh" >/dev/null 2>&1 || true
 
 # Check if we're in a git repository (helpful for the user to know)
 if git rev-parse --is-inside-work-tree >/dev/null 2>&1; then
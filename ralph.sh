@@ -15,6 +15,8 @@
 #
 # Environment Variables:
 #   AGENT_CMD     - Custom command to run (prompt piped to stdin, takes precedence)
+#   RALPH_AGENT_DIRECT - Set to "1" to exec a simple AGENT_CMD directly instead
+#                  of via `bash -lc` (faster, but skips the login profile)
 #   MODEL         - Model override for codex (e.g., "o3", "gpt-4")
 #   MODEL_REASONING_EFFORT - Codex reasoning effort override (e.g., "low", "medium", "high", "xhigh")
 #   SLEEP_SECONDS - Seconds between iterations (default: 2)
@@ -48,7 +50,14 @@ MAX_ITERATIONS="${1:-10}"
 # Determine script location and project root
 # Script lives in scripts/ralph/, so root is two directories up
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-ROOT_DIR="$(cd "$SCRIPT_DIR/../.." && pwd)"
+# SCRIPT_DIR is already absolute and normalized, and `cd ../..` is resolved
+# lexically by Bash, so dropping the last two components gives the same path
+# without resolving it a second time in a subshell. With fewer than three
+# components (e.g. /tmp or /a/b) `cd ../..` stops at /, so do the same.
+case "$SCRIPT_DIR" in
+  /*/*/*) ROOT_DIR="${SCRIPT_DIR%/*/*}" ;;
+  *) ROOT_DIR="/" ;;
+esac
 
 # Path to the prompt file that will be fed to the agent each iteration.
 # Can be overridden via environment variable PROMPT_FILE.
@@ -58,6 +67,30 @@ PROMPT_FILE="${PROMPT_FILE:-$SCRIPT_DIR/prompt.md}"
 # does not rely on prd.json (e.g., understanding mode).
 PRD_FILE="${PRD_FILE:-$SCRIPT_DIR/prd.json}"
 
+# -----------------------------------------------------------------------------
+# VALIDATION
+# -----------------------------------------------------------------------------
+
+# Validate arguments before sourcing the UI toolkit, so a bad invocation fails
+# without paying for ui.sh's start-up probes (it only needs plain echo).
+
+# Ensure max_iterations is a valid integer
+if [[ ! "$MAX_ITERATIONS" =~ ^[0-9]+$ ]]; then
+  echo "scripts/ralph/ralph.sh: MAX_ITERATIONS must be an integer (got: $MAX_ITERATIONS)" >&2
+  exit 2
+fi
+# Normalize to base 10 so the loop arithmetic doesn't read "08" as octal
+MAX_ITERATIONS=$((10#$MAX_ITERATIONS))
+
+# Ensure the prompt file exists
+if [[ ! -f "$PROMPT_FILE" ]]; then
+  echo "scripts/ralph/ralph.sh: missing prompt file: $PROMPT_FILE" >&2
+  exit 1
+fi
+
+# Change to project root for consistent working directory
+cd "$ROOT_DIR"
+
 # -----------------------------------------------------------------------------
 # UI (gum optional)
 # -----------------------------------------------------------------------------
@@ -105,25 +138,6 @@ else
   ui_mode() { printf '%s' 'plain'; }
 fi
 
-# -----------------------------------------------------------------------------
-# VALIDATION
-# -----------------------------------------------------------------------------
-
-# Ensure max_iterations is a valid integer
-if [[ ! "$MAX_ITERATIONS" =~ ^[0-9]+$ ]]; then
-  echo "scripts/ralph/ralph.sh: MAX_ITERATIONS must be an integer (got: $MAX_ITERATIONS)" >&2
-  exit 2
-fi
-
-# Ensure the prompt file exists
-if [[ ! -f "$PROMPT_FILE" ]]; then
-  echo "scripts/ralph/ralph.sh: missing prompt file: $PROMPT_FILE" >&2
-  exit 1
-fi
-
-# Change to project root for consistent working directory
-cd "$ROOT_DIR"
-
 # -----------------------------------------------------------------------------
 # ENVIRONMENT VARIABLES
 # -----------------------------------------------------------------------------
@@ -135,6 +149,11 @@ SLEEP_SECONDS="${SLEEP_SECONDS:-2}"
 # The prompt is piped to this command on stdin
 AGENT_CMD="${AGENT_CMD:-}"
 
+# Opt-in: exec a simple AGENT_CMD directly instead of through `bash -lc`.
+# Off by default because a login shell also loads ~/.bash_profile / ~/.profile
+# (API keys, nvm/pyenv setup, ...) that a direct exec would not see.
+RALPH_AGENT_DIRECT="${RALPH_AGENT_DIRECT:-}"
+
 # Optional model override for codex (e.g., "o3", "gpt-4")
 MODEL="${MODEL:-}"
 
@@ -142,6 +161,17 @@ MODEL="${MODEL:-}"
 # Values are model-dependent (commonly: minimal|low|medium|high|xhigh).
 MODEL_REASONING_EFFORT="${MODEL_REASONING_EFFORT:-}"
 
+# Codex flags derived from MODEL / MODEL_REASONING_EFFORT. They cannot change
+# during a run, so they are built once here instead of on every iteration.
+# -m: model flag, only if MODEL is specified
+# -c: reasoning effort override (Codex config key), only if specified
+# ${VAR:+...} expands to nothing when VAR is empty, and to separate words
+# (value still quoted) when it is set.
+CODEX_MODEL_ARGS=(
+  ${MODEL:+-m "$MODEL"}
+  ${MODEL_REASONING_EFFORT:+-c "model_reasoning_effort=\"$MODEL_REASONING_EFFORT\""}
+)
+
 # Optional branch override for git repos (takes precedence over PRD branchName)
 # Note: do not assign RALPH_BRANCH here; use ${RALPH_BRANCH-} / ${RALPH_BRANCH+x}
 # expansions to remain `set -u` safe while still detecting whether the variable
@@ -150,18 +180,74 @@ MODEL_REASONING_EFFORT="${MODEL_REASONING_EFFORT:-}"
 # Interactive mode - pause after each iteration for human review
 # Set to "1", "true", or "yes" to enable
 INTERACTIVE="${INTERACTIVE:-}"
+# Parsed once into a flag ("1" or empty) for the per-iteration checks.
+INTERACTIVE_ENABLED=""
+case "$INTERACTIVE" in
+  1|true|yes) INTERACTIVE_ENABLED="1" ;;
+esac
 
 # Optional safety guard (git repos only): restrict which paths may change.
 # Provide comma-separated paths relative to repo root, for example:
 #   ALLOWED_PATHS="scripts/ralph/codebase_map.md"
 ALLOWED_PATHS="${ALLOWED_PATHS:-}"
 
+# Codex display switches:
+# - RALPH_AI_RAW=1 streams raw codex output (no transcript pretty-printer)
+# - RALPH_AI_SHOW_FINAL=0 hides the final message shown after each run
+RALPH_AI_RAW="${RALPH_AI_RAW-}"
+RALPH_AI_SHOW_FINAL="${RALPH_AI_SHOW_FINAL-1}"
+
 # -----------------------------------------------------------------------------
 # HELPERS
 # -----------------------------------------------------------------------------
 
+# Resolved path of the codex binary. Looked up once (see codex_bin) rather than
+# scanning PATH on every iteration.
+CODEX_BIN=""
+
+codex_bin() {
+  # Resolve codex on PATH once and cache it for the rest of the run.
+  if [[ -z "$CODEX_BIN" ]]; then
+    CODEX_BIN="$(command -v codex 2>/dev/null || true)"
+  fi
+  [[ -n "$CODEX_BIN" ]]
+}
+
+# Codex --output-last-message target, created lazily on the first codex
+# iteration and reused for the rest of the run.
+LAST_MSG_FILE=""
+
+cleanup_last_msg_file() {
+  if [[ -n "$LAST_MSG_FILE" ]]; then
+    rm -f "$LAST_MSG_FILE"
+  fi
+}
+
+# Cached is_git_repo result ("1"/"0"; empty until first checked). Whether the
+# root is inside a git work tree does not change during a run, and the guard
+# asks on every iteration.
+GIT_REPO_STATE=""
+
 is_git_repo() {
-  git rev-parse --is-inside-work-tree >/dev/null 2>&1
+  if [[ -z "$GIT_REPO_STATE" ]]; then
+    GIT_REPO_STATE="0"
+    git rev-parse --is-inside-work-tree >/dev/null 2>&1 && GIT_REPO_STATE="1"
+  fi
+  [[ "$GIT_REPO_STATE" == "1" ]]
+}
+
+# Repo top level and ROOT_DIR's path below it ("" at the top, else "sub/dir/").
+# git status reports paths from the top level, so the guard resolves these
+# once (see resolve_git_toplevel) to match and revert paths when ROOT_DIR is a
+# subdirectory of the repo.
+GIT_TOPLEVEL=""
+GIT_PREFIX=""
+
+resolve_git_toplevel() {
+  [[ -n "$GIT_TOPLEVEL" ]] && return 0
+  { IFS= read -r GIT_TOPLEVEL; IFS= read -r GIT_PREFIX; } \
+    < <(git rev-parse --show-toplevel --show-prefix 2>/dev/null) || true
+  GIT_TOPLEVEL="${GIT_TOPLEVEL:-$ROOT_DIR}"
 }
 
 trim_ws() {
@@ -172,32 +258,49 @@ trim_ws() {
   printf '%s' "$s"
 }
 
-path_is_allowed() {
-  # Check if a repo-root-relative path is allowed by ALLOWED_PATHS.
-  # Allowed entries are either:
-  # - exact file paths (e.g., scripts/ralph/codebase_map.md)
-  # - directory prefixes ending with / (e.g., docs/)
-  local path="$1"
-  local allowed raw
+# ALLOWED_PATHS split into trimmed, non-empty entries and partitioned by rule:
+# exact file paths vs directory prefixes (entries ending with /). It does not
+# change during a run, so it is parsed once here rather than for every changed
+# file, and path_is_allowed never re-inspects an entry to pick its rule.
+ALLOWED_EXACT_PATHS=()
+ALLOWED_PREFIX_PATHS=()
 
+parse_allowed_paths() {
+  local allowed raw
+  ALLOWED_EXACT_PATHS=()
+  ALLOWED_PREFIX_PATHS=()
   IFS=',' read -r -a allowed <<< "$ALLOWED_PATHS"
   # Bash 3.2 + `set -u`: expanding an empty array like "${allowed[@]}" errors.
   for raw in "${allowed[@]+"${allowed[@]}"}"; do
     raw="$(trim_ws "$raw")"
     [[ -z "$raw" ]] && continue
-
-    # Directory prefix rule
     if [[ "$raw" == */ ]]; then
-      if [[ "$path" == "$raw"* ]]; then
-        return 0
-      fi
-      continue
+      ALLOWED_PREFIX_PATHS+=("$raw")
+    else
+      ALLOWED_EXACT_PATHS+=("$raw")
     fi
+  done
+  return 0
+}
 
-    # Exact match rule
-    if [[ "$path" == "$raw" ]]; then
-      return 0
-    fi
+parse_allowed_paths
+
+path_is_allowed() {
+  # Check if a repo-root-relative path is allowed by ALLOWED_PATHS.
+  # Allowed entries are either:
+  # - exact file paths (e.g., scripts/ralph/codebase_map.md)
+  # - directory prefixes ending with / (e.g., docs/)
+  local path="$1"
+  local raw
+
+  # Exact match rule
+  for raw in "${ALLOWED_EXACT_PATHS[@]+"${ALLOWED_EXACT_PATHS[@]}"}"; do
+    [[ "$path" == "$raw" ]] && return 0
+  done
+
+  # Directory prefix rule
+  for raw in "${ALLOWED_PREFIX_PATHS[@]+"${ALLOWED_PREFIX_PATHS[@]}"}"; do
+    [[ "$path" == "$raw"* ]] && return 0
   done
 
   return 1
@@ -209,48 +312,49 @@ enforce_allowed_paths_if_configured() {
   [[ -z "$ALLOWED_PATHS" ]] && return 0
   is_git_repo || return 0
 
-  local changed_files=()
-  local f
-
-  # Unstaged changes
-  while IFS= read -r f; do
-    [[ -n "$f" ]] && changed_files+=("$f")
-  done < <(git diff --name-only)
-
-  # Staged changes
-  while IFS= read -r f; do
-    [[ -n "$f" ]] && changed_files+=("$f")
-  done < <(git diff --name-only --cached)
-
-  # Untracked files
-  while IFS= read -r f; do
-    [[ -n "$f" ]] && changed_files+=("$f")
-  done < <(git ls-files --others --exclude-standard)
-
-  # Deduplicate
-  local unique=()
-  # Bash 3.2 + `set -u`: expanding an empty array like "${changed_files[@]}" errors.
-  for f in "${changed_files[@]+"${changed_files[@]}"}"; do
-    # Bash 3.2 (macOS default) does not support associative arrays, so do a
-    # simple linear dedupe here. The list is typically small, so O(n^2) is fine.
-    local already_seen=""
-    local u
-    for u in "${unique[@]+"${unique[@]}"}"; do
-      if [[ "$u" == "$f" ]]; then
-        already_seen="1"
-        break
-      fi
-    done
-    [[ -z "$already_seen" ]] && unique+=("$f")
-  done
+  resolve_git_toplevel
 
-  # Compute disallowed
+  # disallowed holds ROOT_DIR-relative paths for the report; the tracked /
+  # untracked split keeps the top-level paths git status gave, which is what
+  # the revert below operates on (from GIT_TOPLEVEL).
   local disallowed=()
-  for f in "${unique[@]+"${unique[@]}"}"; do
-    if ! path_is_allowed "$f"; then
-      disallowed+=("$f")
+  local disallowed_tracked=()
+  local disallowed_untracked=()
+  local f rel rec
+
+  # Unstaged, staged and untracked changes from a single `git status` (one git
+  # process and one index read). Each path appears once, so no dedupe needed.
+  # -z: NUL-terminated "XY path" records with unquoted paths; renames/copies
+  #     are followed by an extra record holding the original path (skipped).
+  # The XY code also says whether a path is untracked ("??"), so reverting
+  # needs no per-file `git ls-files` lookup.
+  # GIT_OPTIONAL_LOCKS=0: this is a read-only check, so skip the opportunistic
+  # index refresh write (and its .git/index.lock) that status does by default.
+  # Paths are relative to the repo top level (f); ALLOWED_PATHS is matched
+  # against the path relative to ROOT_DIR (rel). Untracked files outside
+  # ROOT_DIR are not checked; tracked changes there are matched as reported.
+  while IFS= read -r -d '' rec; do
+    f="${rec:3}"
+    rel="$f"
+    if [[ -n "$GIT_PREFIX" ]]; then
+      if [[ "$f" == "$GIT_PREFIX"* ]]; then
+        rel="${f#"$GIT_PREFIX"}"
+      elif [[ "${rec:0:2}" == "??" ]]; then
+        rel=""
+      fi
     fi
-  done
+    if [[ -n "$rel" ]] && ! path_is_allowed "$rel"; then
+      disallowed+=("$rel")
+      if [[ "${rec:0:2}" == "??" ]]; then
+        disallowed_untracked+=("$f")
+      else
+        disallowed_tracked+=("$f")
+      fi
+    fi
+    case "${rec:0:2}" in
+      *R*|*C*) IFS= read -r -d '' rec || true ;;
+    esac
+  done < <(GIT_OPTIONAL_LOCKS=0 git status --porcelain=v1 -z --untracked-files=all)
 
   if (( ${#disallowed[@]} == 0 )); then
     return 0
@@ -266,7 +370,7 @@ enforce_allowed_paths_if_configured() {
     done
   } | ui_box_err
 
-  if [[ "$INTERACTIVE" =~ ^(1|true|yes)$ ]]; then
+  if [[ -n "$INTERACTIVE_ENABLED" ]]; then
     local action=""
     action="$(ui_choose_fd 2 "Disallowed changes detected — choose an action" "Quit" \
       "Quit" "Revert and continue" "Continue anyway")"
@@ -274,13 +378,27 @@ enforce_allowed_paths_if_configured() {
     case "$action" in
       "Revert and continue")
         ui_info_err "Reverting disallowed changes..."
-        for f in "${disallowed[@]}"; do
-          if git ls-files --error-unmatch -- "$f" >/dev/null 2>&1; then
-            git restore --staged --worktree -- "$f" >/dev/null 2>&1 || true
-          else
-            rm -rf -- "$ROOT_DIR/$f" >/dev/null 2>&1 || true
+        # One git restore for all tracked files and one rm for all untracked
+        # ones. git restore rejects the whole batch if any pathspec fails, so
+        # fall back to per-file restores (best effort, as before) in that case.
+        # Both work from the repo top level, which the paths are relative to.
+        if (( ${#disallowed_tracked[@]} > 0 )); then
+          if ! git -C "$GIT_TOPLEVEL" restore --staged --worktree -- "${disallowed_tracked[@]}" >/dev/null 2>&1; then
+            for f in "${disallowed_tracked[@]}"; do
+              git -C "$GIT_TOPLEVEL" restore --staged --worktree -- "$f" >/dev/null 2>&1 || true
+            done
           fi
-        done
+        fi
+        if (( ${#disallowed_untracked[@]} > 0 )); then
+          # Build the absolute paths in a loop rather than with ${arr[@]/#/...}:
+          # the replacement would treat a "&" in the directory as the match
+          # (patsub_replacement, Bash 5.2).
+          local untracked_paths=()
+          for f in "${disallowed_untracked[@]}"; do
+            untracked_paths+=("$GIT_TOPLEVEL/$f")
+          done
+          rm -rf -- "${untracked_paths[@]}" >/dev/null 2>&1 || true
+        fi
         ;;
       "Continue anyway")
         ui_warn_err "Continuing anyway (leaving disallowed changes as-is)."
@@ -343,12 +461,27 @@ PY
     return 0
   fi
 
-  if git show-ref --verify --quiet "refs/heads/$branch"; then
+  # Try the switch first and only create the branch if that fails, instead of
+  # asking git show-ref beforehand (one git process when the branch exists).
+  # git switch only accepts local branches (a tag or SHA of the same name
+  # would detach HEAD under checkout), and --no-guess keeps it from creating a
+  # branch off a same-named remote branch.
+  local out="" create_out=""
+  if out="$(git switch --no-guess "$branch" 2>&1)"; then
     ui_info "Branch: switching to existing $branch${source:+ (from $source)}"
-    git checkout "$branch" 2>&1 | ui_stream_prefix_fd 1 "GIT"
-  else
+    [[ -z "$out" ]] || printf '%s\n' "$out" | ui_stream_prefix_fd 1 "GIT"
+  elif create_out="$(git switch -c "$branch" 2>&1)"; then
     ui_info "Branch: creating branch $branch${source:+ (from $source)}"
-    git checkout -b "$branch" 2>&1 | ui_stream_prefix_fd 1 "GIT"
+    [[ -z "$create_out" ]] || printf '%s\n' "$create_out" | ui_stream_prefix_fd 1 "GIT"
+  else
+    # Both failed. If the branch exists, the switch is what failed (e.g. local
+    # changes block it); otherwise the create failed, so show its output.
+    ui_err "Branch: could not switch to $branch"
+    if ! git show-ref --verify --quiet "refs/heads/$branch"; then
+      out="$create_out"
+    fi
+    [[ -z "$out" ]] || printf '%s\n' "$out" | ui_stream_prefix_fd 2 "GIT"
+    return 1
   fi
 }
 
@@ -370,13 +503,13 @@ ui_section "Startup"
   fi
   ui_kv_fd 1 "Max iterations" "$MAX_ITERATIONS"
   ui_kv_fd 1 "Sleep" "${SLEEP_SECONDS}s"
-  ui_kv_fd 1 "Interactive" "$(if [[ "$INTERACTIVE" =~ ^(1|true|yes)$ ]]; then echo yes; else echo no; fi)"
+  ui_kv_fd 1 "Interactive" "$(if [[ -n "$INTERACTIVE_ENABLED" ]]; then echo yes; else echo no; fi)"
   ui_kv_fd 1 "Allowed paths" "$(if [[ -n "$ALLOWED_PATHS" ]]; then echo "$ALLOWED_PATHS"; else echo "<disabled>"; fi)"
   ui_kv_fd 1 "Reasoning" "$(if [[ -n "$MODEL_REASONING_EFFORT" ]]; then echo "$MODEL_REASONING_EFFORT"; else echo "<default>"; fi)"
   ui_kv_fd 1 "UI" "$(ui_mode)"
 } | ui_box
 
-if [[ "$INTERACTIVE" =~ ^(1|true|yes)$ ]] && ! ui_can_prompt; then
+if [[ -n "$INTERACTIVE_ENABLED" ]] && ! ui_can_prompt; then
   ui_warn "Interactive mode is enabled but stdin is not a TTY; prompts will auto-select defaults."
 fi
 
@@ -400,101 +533,157 @@ else
 fi
 
 # -----------------------------------------------------------------------------
-# MAIN LOOP
+# AGENT RUNNERS
 # -----------------------------------------------------------------------------
-# Run the agent repeatedly until it signals completion or we hit max iterations
+# Each runner executes one iteration of its agent and exits 0 when the agent
+# signals completion (<promise>COMPLETE</promise>). The runner is selected once
+# below instead of re-testing AGENT_CMD on every iteration; to support another
+# agent, add a runner and a branch to the selection.
 
-for i in $(seq 1 "$MAX_ITERATIONS"); do
-  ui_section "Iteration $i / $MAX_ITERATIONS"
-  ITER_START_SECONDS="$SECONDS"
-
-  # -------------------------------------------------------------------------
-  # CUSTOM AGENT COMMAND (takes precedence if set)
-  # -------------------------------------------------------------------------
-  # If AGENT_CMD is set, use it directly. The prompt is piped to stdin.
-  # This allows any CLI tool that accepts input on stdin.
-  
-  if [[ -n "$AGENT_CMD" ]]; then
-    # Run custom agent command with prompt on stdin
-    # - bash -lc: run in login shell for full environment
-    # - ui_tee_prefix_err: show output in real-time (prefixed) while capturing raw
-    # - || true: don't abort loop on agent failure
-    ui_channel_header_err "AI" "Agent output"
-    OUTPUT="$(cat "$PROMPT_FILE" | bash -lc "$AGENT_CMD" 2>&1 | ui_tee_ai_pretty_err)" || true
-    ui_channel_footer_err "AI" "Agent output"
-
-    # Check if agent signaled completion
-    # The magic marker is: <promise>COMPLETE</promise>
-    if echo "$OUTPUT" | grep -q "<promise>COMPLETE</promise>"; then
-      ui_ok "Done"
-      exit 0  # Success! All stories complete
+# Custom agent command (takes precedence if set). The prompt is fed on stdin,
+# which allows any CLI tool that accepts input on stdin.
+#
+# By default AGENT_CMD runs through `bash -lc`, so the login profile is loaded.
+# With RALPH_AGENT_DIRECT=1 it is parsed once here instead: a simple command
+# (plain words: no quotes, pipes, redirections, globs or variables) whose
+# program is already on PATH is split into AGENT_ARGV and exec'd directly,
+# saving a login shell start-up (profile sourcing) on every iteration. Anything
+# else still runs through `bash -lc`, with a warning that direct exec was not
+# possible.
+AGENT_SIMPLE_CMD_RE='^[-A-Za-z0-9_./:@,+=% ]+$'
+AGENT_ARGV=()
+if [[ -n "$AGENT_CMD" && "$RALPH_AGENT_DIRECT" == "1" ]]; then
+  if [[ "$AGENT_CMD" =~ $AGENT_SIMPLE_CMD_RE ]]; then
+    read -r -a AGENT_ARGV <<<"$AGENT_CMD"
+    # A leading VAR=value assignment needs a shell; so does an unknown program.
+    if [[ "${AGENT_ARGV[0]-}" == *=* ]] || ! command -v "${AGENT_ARGV[0]-}" >/dev/null 2>&1; then
+      AGENT_ARGV=()
     fi
+  fi
+  if (( ${#AGENT_ARGV[@]} > 0 )); then
+    ui_info "Agent: running AGENT_CMD directly (login profile not loaded)"
+  else
+    ui_warn "RALPH_AGENT_DIRECT=1 but AGENT_CMD needs a shell (shell syntax or program not on PATH); running it via bash -lc"
+  fi
+fi
 
-  # -------------------------------------------------------------------------
-  # CODEX AGENT (default)
-  # -------------------------------------------------------------------------
-  # The default agent is OpenAI's Codex CLI. We pipe the prompt to it and
-  # capture the last message to check for the completion signal.
-  
+run_agent_cmd() {
+  if (( ${#AGENT_ARGV[@]} > 0 )); then
+    "${AGENT_ARGV[@]}"
   else
-    # Verify codex is installed
-    if ! command -v codex >/dev/null 2>&1; then
-      ui_err_err "codex not found in PATH"
-      ui_info_err "Install codex or set AGENT_CMD to use a different agent"
-      exit 1
-    fi
+    bash -lc "$AGENT_CMD"
+  fi
+}
 
-    # Create temp file to capture the agent's last message
+run_custom_agent() {
+  # Run custom agent command with prompt on stdin
+  # - < "$PROMPT_FILE": the agent reads the prompt file directly (no `cat`
+  #   process or extra pipe between us and the agent)
+  # - run_agent_cmd: exec the command directly when it is simple, otherwise
+  #   run it via bash -lc (login shell for full environment); see AGENT_ARGV
+  # - ui_tee_ai_pretty_err: show output in real-time (prefixed) while passing raw on
+  # - grep -c: count completion markers as the raw stream goes by, so memory
+  #   stays constant instead of holding the whole transcript in a variable
+  #   (-c rather than -q so the agent is never cut off by an early exit)
+  # - || true: don't abort loop on agent failure
+  ui_channel_header_err "AI" "Agent output"
+  local COMPLETE_MATCHES=""
+  COMPLETE_MATCHES="$(run_agent_cmd <"$PROMPT_FILE" 2>&1 | ui_tee_ai_pretty_err \
+    | grep -c -F "<promise>COMPLETE</promise>")" || true
+  ui_channel_footer_err "AI" "Agent output"
+
+  # Check if agent signaled completion
+  # The magic marker is: <promise>COMPLETE</promise>
+  if (( ${COMPLETE_MATCHES:-0} > 0 )); then
+    ui_ok "Done"
+    exit 0  # Success! All stories complete
+  fi
+}
+
+# Codex agent (default). We feed the prompt to OpenAI's Codex CLI and capture
+# the last message to check for the completion signal.
+run_codex_agent() {
+  # Verify codex is installed
+  if ! codex_bin; then
+    ui_err_err "codex not found in PATH"
+    ui_info_err "Install codex or set AGENT_CMD to use a different agent"
+    exit 1
+  fi
+
+  # One-time setup on the first codex iteration; none of it changes between
+  # iterations.
+  # Temp file to capture the agent's last message. It is allocated once per
+  # run (removed on exit) and truncated each iteration, so a stale message
+  # from a previous iteration can never be mistaken for this one's.
+  if [[ -z "$LAST_MSG_FILE" ]]; then
     LAST_MSG_FILE="$(mktemp)"
+    trap cleanup_last_msg_file EXIT
 
-    # Build codex command arguments
+    # Build codex command arguments in a single array literal
     # -C: working directory
     # --output-last-message: save final message to file for completion detection
-    CODEX_ARGS=(exec -C "$ROOT_DIR" --output-last-message "$LAST_MSG_FILE")
-    
-    # Add model flag if specified
-    if [[ -n "$MODEL" ]]; then
-      CODEX_ARGS+=(-m "$MODEL")
-    fi
-    
-    # Add reasoning effort override if specified (Codex config key)
-    if [[ -n "$MODEL_REASONING_EFFORT" ]]; then
-      CODEX_ARGS+=(-c "model_reasoning_effort=\"$MODEL_REASONING_EFFORT\"")
-    fi
-
-    # Run codex with the prompt piped to stdin
-    # - ui_stream_prefix_fd: show output in real-time with AI demarcation
-    # - || true: don't abort loop on agent failure (max iterations is the backstop)
-    ui_channel_header_err "AI" "Codex output"
-    if [[ "${RALPH_AI_RAW-}" == "1" ]]; then
-      cat "$PROMPT_FILE" | codex "${CODEX_ARGS[@]}" - 2>&1 | ui_stream_prefix_fd 2 "AI" || true
+    # plus the precomputed model / reasoning flags (see CODEX_MODEL_ARGS)
+    # Bash 3.2 + `set -u`: expanding an empty array like "${CODEX_MODEL_ARGS[@]}" errors.
+    CODEX_ARGS=(exec -C "$ROOT_DIR" --output-last-message "$LAST_MSG_FILE"
+      "${CODEX_MODEL_ARGS[@]+"${CODEX_MODEL_ARGS[@]}"}")
+  fi
+  : >"$LAST_MSG_FILE"
+
+  # Run codex with the prompt file as stdin
+  # - < "$PROMPT_FILE": codex reads the file directly (no `cat` process, and no
+  #   pipe that a large prompt could fill while codex is busy writing output)
+  # - ui_stream_prefix_fd: show output in real-time with AI demarcation
+  # - || true: don't abort loop on agent failure (max iterations is the backstop)
+  ui_channel_header_err "AI" "Codex output"
+  if [[ "$RALPH_AI_RAW" == "1" ]]; then
+    "$CODEX_BIN" "${CODEX_ARGS[@]}" - <"$PROMPT_FILE" 2>&1 | ui_stream_prefix_fd 2 "AI" || true
+  else
+    "$CODEX_BIN" "${CODEX_ARGS[@]}" - <"$PROMPT_FILE" 2>&1 | ui_codex_pretty_stream_fd 2 "$PROMPT_FILE" || true
+  fi
+  ui_channel_footer_err "AI" "Codex output"
+
+  # Read the final message once (builtin read, no cat/grep forks) and reuse
+  # it for both display and completion detection.
+  local LAST_MSG=""
+  IFS= read -r -d '' LAST_MSG <"$LAST_MSG_FILE" || true
+
+  # Always show the final assistant message as a reliable fallback. This avoids
+  # cases where the streaming transcript format changes and we miss AI lines.
+  if [[ "$RALPH_AI_SHOW_FINAL" != "0" ]]; then
+    if [[ -n "$LAST_MSG" ]]; then
+      ui_channel_header_err "AI" "Final message"
+      ui_ai_pretty_stream_fd 2 "AI" <<<"${LAST_MSG%$'\n'}"
+      ui_channel_footer_err "AI" "Final message"
     else
-      cat "$PROMPT_FILE" | codex "${CODEX_ARGS[@]}" - 2>&1 | ui_codex_pretty_stream_fd 2 "$PROMPT_FILE" || true
-    fi
-    ui_channel_footer_err "AI" "Codex output"
-
-    # Always show the final assistant message as a reliable fallback. This avoids
-    # cases where the streaming transcript format changes and we miss AI lines.
-    if [[ "${RALPH_AI_SHOW_FINAL-1}" != "0" ]]; then
-      if [[ -s "$LAST_MSG_FILE" ]]; then
-        ui_channel_header_err "AI" "Final message"
-        cat "$LAST_MSG_FILE" | ui_ai_pretty_stream_fd 2 "AI"
-        ui_channel_footer_err "AI" "Final message"
-      else
-        ui_warn_err "No final message captured (LAST_MSG_FILE is empty)"
-      fi
-    fi
-
-    # Check if agent signaled completion
-    if grep -q "<promise>COMPLETE</promise>" "$LAST_MSG_FILE"; then
-      ui_ok "Done"
-      rm -f "$LAST_MSG_FILE"
-      exit 0  # Success! All stories complete
+      ui_warn_err "No final message captured (LAST_MSG_FILE is empty)"
     fi
+  fi
 
-    # Clean up temp file
-    rm -f "$LAST_MSG_FILE"
+  # Check if agent signaled completion
+  if [[ "$LAST_MSG" == *"<promise>COMPLETE</promise>"* ]]; then
+    ui_ok "Done"
+    exit 0  # Success! All stories complete
   fi
+}
+
+if [[ -n "$AGENT_CMD" ]]; then
+  AGENT_RUNNER="run_custom_agent"
+else
+  AGENT_RUNNER="run_codex_agent"
+fi
+
+# -----------------------------------------------------------------------------
+# MAIN LOOP
+# -----------------------------------------------------------------------------
+# Run the agent repeatedly until it signals completion or we hit max iterations
+
+# Arithmetic loop: no `seq` process or pre-expanded list of iteration numbers
+for (( i = 1; i <= MAX_ITERATIONS; i++ )); do
+  ui_section "Iteration $i / $MAX_ITERATIONS"
+  ITER_START_SECONDS="$SECONDS"
+
+  # Run one iteration of the selected agent (exits 0 on completion)
+  "$AGENT_RUNNER"
 
   # Optional guardrail: enforce allowed paths if configured (git repos only)
   enforce_allowed_paths_if_configured
@@ -505,7 +694,7 @@ for i in $(seq 1 "$MAX_ITERATIONS"); do
   # If INTERACTIVE is enabled, pause and ask the human what to do next.
   # This allows reviewing changes before the next iteration.
   
-  if [[ "$INTERACTIVE" =~ ^(1|true|yes)$ ]]; then
+  if [[ -n "$INTERACTIVE_ENABLED" ]]; then
     ui_channel_header_err "USER" "Iteration review"
     ITER_ELAPSED_SECONDS=$((SECONDS - ITER_START_SECONDS))
     choice="$(ui_choose_fd 2 "Iteration $i complete (${ITER_ELAPSED_SECONDS}s) — what next?" "Continue" \
@@ -516,7 +705,7 @@ for i in $(seq 1 "$MAX_ITERATIONS"); do
     case "$choice" in
       "Skip interactive (autonomous)")
         ui_info "Skipping to autonomous mode..."
-        INTERACTIVE=""
+        INTERACTIVE_ENABLED=""
         ;;
       "Quit")
         ui_info "Stopped by user"
@@ -532,8 +721,12 @@ for i in $(seq 1 "$MAX_ITERATIONS"); do
   # ITERATION DELAY
   # -------------------------------------------------------------------------
   # Sleep between iterations to avoid hammering APIs and allow the agent's
-  # changes to settle (e.g., file writes, git operations)
-  sleep "$SLEEP_SECONDS"
+  # changes to settle (e.g., file writes, git operations). Nothing follows the
+  # last iteration, so don't make the user wait for it; SLEEP_SECONDS=0 skips
+  # the sleep process entirely.
+  if (( i < MAX_ITERATIONS )) && [[ "$SLEEP_SECONDS" != "0" ]]; then
+    sleep "$SLEEP_SECONDS"
+  fi
 done
 
 # -----------------------------------------------------------------------------
@@ -18,22 +18,73 @@
 # - GUM_FORCE:  1 to force gum even if not a TTY (not recommended for CI logs)
 # - NO_COLOR:   disable ANSI colors (standard)
 # - RALPH_ASCII:1 to use ASCII separators instead of box-drawing chars
+# (These, and TERM, are read once when ui.sh is sourced.)
 # =============================================================================
 
 # shellcheck disable=SC2034  # many vars are used indirectly by callers
 
 ui__has_cmd() { command -v "$1" >/dev/null 2>&1; }
+
+# Command lookups are resolved once when ui.sh is sourced: every styled line
+# consults gum availability, and PATH does not change while Ralph runs.
+# Resolving eagerly (rather than on first use) keeps the cache valid inside
+# $(...) subshells too.
+UI__HAS_GUM="0"
+ui__has_cmd gum && UI__HAS_GUM="1"
+UI__HAS_TPUT="0"
+ui__has_cmd tput && UI__HAS_TPUT="1"
+# awk does the bulk line prefixing: it reads pipes in large blocks, whereas a
+# Bash `while read` loop issues one read(2) per byte. mawk (Debian/Ubuntu's
+# default awk) also needs `-W interactive`, or it holds lines back until its
+# input buffer fills, which would stall live agent output.
+UI__AWK_MODE="none"
+if ui__has_cmd awk; then
+  case "$(awk -W version 2>/dev/null </dev/null || true)" in
+    mawk*) UI__AWK_MODE="mawk" ;;
+    *) UI__AWK_MODE="awk" ;;
+  esac
+fi
+# Environment switches are snapshotted the same way: they cannot change while
+# Ralph runs, so the per-line color / ASCII checks become plain flag tests.
+UI__ASCII="0"
+[[ "${RALPH_ASCII-}" == "1" ]] && UI__ASCII="1"
+UI__NO_COLOR="0"
+[[ -n "${NO_COLOR-}" || "${TERM-}" == "dumb" ]] && UI__NO_COLOR="1"
+# RALPH_UI normalized to: on (force gum), auto (gum on a TTY) or off (plain,
+# unknown values, or gum not installed). GUM_FORCE=1 turns auto into on, since
+# the only thing auto still decides per call is the TTY check it overrides.
+UI__GUM_MODE="off"
+if [[ "$UI__HAS_GUM" == "1" ]]; then
+  case "${RALPH_UI-auto}" in
+    gum) UI__GUM_MODE="on" ;;
+    auto|"")
+      UI__GUM_MODE="auto"
+      [[ "${GUM_FORCE-}" == "1" ]] && UI__GUM_MODE="on"
+      ;;
+    *) UI__GUM_MODE="off" ;;  # plain|off|no|0; unknown values: be conservative
+  esac
+fi
+ui__has_gum() { [[ "$UI__HAS_GUM" == "1" ]]; }
+ui__has_tput() { [[ "$UI__HAS_TPUT" == "1" ]]; }
+
 ui__is_tty_fd() { local fd="$1"; [[ -t "$fd" ]]; }
-ui__lower() { printf '%s' "$1" | tr '[:upper:]' '[:lower:]'; }
-ui__trim_ws() {
-  # Trim leading/trailing whitespace (Bash 3.2 safe).
-  local s="$1"
-  s="${s#"${s%%[![:space:]]*}"}"
-  s="${s%"${s##*[![:space:]]}"}"
-  printf '%s' "$s"
+
+ui__awk_stream() {
+  # Run an awk program that streams stdin line-by-line (see UI__AWK_MODE).
+  # The program must fflush() after each output line.
+  # NUL bytes are not handled like the old read loop, which dropped them: gawk
+  # passes them through and interactive mawk cuts the line at the first one.
+  # Agent output is text, so this is accepted; stripping them with `tr -d`
+  # first is not an option, as tr block-buffers into the pipe and stalls output.
+  if [[ "$UI__AWK_MODE" == "mawk" ]]; then
+    awk -W interactive "$@"
+  else
+    awk "$@"
+  fi
 }
+ui__lower() { printf '%s' "$1" | tr '[:upper:]' '[:lower:]'; }
 
-ui__ascii() { [[ "${RALPH_ASCII-}" == "1" ]]; }
+ui__ascii() { [[ "$UI__ASCII" == "1" ]]; }
 
 ui__rule_char() {
   if ui__ascii; then
@@ -43,17 +94,9 @@ ui__rule_char() {
   fi
 }
 
-ui__pipe_char() {
-  if ui__ascii; then
-    printf '%s' '|'
-  else
-    printf '%s' '│'
-  fi
-}
-
 ui__term_cols() {
   local cols="${COLUMNS-}"
-  if ui__has_cmd tput; then
+  if ui__has_tput; then
     cols="$(tput cols 2>/dev/null || true)"
   fi
   cols="${cols:-80}"
@@ -62,30 +105,17 @@ ui__term_cols() {
 
 ui__use_gum_fd() {
   local fd="$1"
-  local mode="${RALPH_UI-auto}"
 
-  ui__has_cmd gum || return 1
-
-  case "$mode" in
-    gum) return 0 ;;
-    plain|off|no|0) return 1 ;;
-    auto|"")
-      if ui__is_tty_fd "$fd" || [[ "${GUM_FORCE-}" == "1" ]]; then
-        return 0
-      fi
-      return 1
-      ;;
-    *)
-      # Unknown value: be conservative
-      return 1
-      ;;
+  case "$UI__GUM_MODE" in
+    on) return 0 ;;
+    auto) ui__is_tty_fd "$fd" ;;
+    *) return 1 ;;
   esac
 }
 
 ui__use_color_fd() {
   local fd="$1"
-  [[ -n "${NO_COLOR-}" ]] && return 1
-  [[ "${TERM-}" == "dumb" ]] && return 1
+  [[ "$UI__NO_COLOR" == "1" ]] && return 1
   ui__is_tty_fd "$fd" || return 1
   return 0
 }
@@ -273,37 +303,56 @@ ui_channel_footer_fd() {
   fi
 }
 
+ui__tag_prefix_to() {
+  # Build the "<tag> │ " prefix used for demarcated channel lines, colored per
+  # tag when colors are enabled. This is the single tag → color table shared
+  # by the prefixing helpers below; writes into a variable (no subshells).
+  #
+  # Args: fd tag outvar
+  local fd="$1"
+  local tag="$2"
+  local outvar="$3"
+
+  local sep='│'
+  ui__ascii && sep='|'
+
+  if ! ui__use_color_fd "$fd"; then
+    printf -v "$outvar" '%s %s ' "$tag" "$sep"
+    return 0
+  fi
+
+  local code
+  case "$tag" in
+    AI) code='35;1' ;;          # bold magenta
+    THINK) code='35;2' ;;       # dim magenta (if supported)
+    USER) code='36;1' ;;        # bold cyan
+    PROMPT) code='36;1' ;;      # bold cyan
+    SYS) code='90;1' ;;         # bold gray
+    TOOL) code='38;5;214;1' ;;  # bold orange
+    GIT) code='34;1' ;;         # bold blue
+    GUARD) code='33;1' ;;       # bold yellow
+    *) code='1' ;;
+  esac
+  printf -v "$outvar" '\033[%sm%s\033[0m %s ' "$code" "$tag" "$sep"
+}
+
 ui_stream_prefix_fd() {
   # Stream stdin to fd with a colored prefix, line-by-line.
   # Usage: cmd | ui_stream_prefix_fd 2 "AI"
   local fd="$1"
   local tag="$2"
-  local sep; sep="$(ui__pipe_char)"
 
-  local color_tag=""
-  local reset=""
-  if ui__use_color_fd "$fd"; then
-    reset="$(ui__ansi_reset "$fd")"
-    case "$tag" in
-      AI) color_tag="$(ui__ansi "$fd" '35;1')" ;;      # bold magenta
-      THINK) color_tag="$(ui__ansi "$fd" '35;2')" ;;   # dim magenta (if supported)
-      USER) color_tag="$(ui__ansi "$fd" '36;1')" ;;    # bold cyan
-      PROMPT) color_tag="$(ui__ansi "$fd" '36;1')" ;;  # bold cyan
-      SYS) color_tag="$(ui__ansi "$fd" '90;1')" ;;     # bold gray
-      TOOL) color_tag="$(ui__ansi "$fd" '38;5;214;1')" ;; # bold orange
-      GIT) color_tag="$(ui__ansi "$fd" '34;1')" ;;     # bold blue
-      GUARD) color_tag="$(ui__ansi "$fd" '33;1')" ;;   # bold yellow
-      *) color_tag="$(ui__ansi "$fd" '1')" ;;
-    esac
+  local prefix=""
+  ui__tag_prefix_to "$fd" "$tag" prefix
+
+  if [[ "$UI__AWK_MODE" != "none" ]]; then
+    ui__awk_stream -v p="$prefix" '{ print p $0; fflush() }' >&"$fd"
+    return 0
   fi
 
   local line
   while IFS= read -r line || [[ -n "$line" ]]; do
-    if [[ -n "$color_tag" ]]; then
-      printf '%s%s%s %s %s\n' "$color_tag" "$tag" "$reset" "$sep" "$line" >&"$fd"
-    else
-      printf '%s %s %s\n' "$tag" "$sep" "$line" >&"$fd"
-    fi
+    printf '%s%s\n' "$prefix" "$line" >&"$fd"
   done
 }
 
@@ -313,37 +362,28 @@ ui_print_prefixed_fd() {
   local fd="$1"
   local tag="$2"
   local line="${3-}"
-  local sep; sep="$(ui__pipe_char)"
 
   if [[ -z "$line" ]]; then
     printf '\n' >&"$fd"
     return 0
   fi
 
-  local color_tag=""
-  local reset=""
-  if ui__use_color_fd "$fd"; then
-    reset="$(ui__ansi_reset "$fd")"
-    case "$tag" in
-      AI) color_tag="$(ui__ansi "$fd" '35;1')" ;;      # bold magenta
-      THINK) color_tag="$(ui__ansi "$fd" '35;2')" ;;   # dim magenta (if supported)
-      USER) color_tag="$(ui__ansi "$fd" '36;1')" ;;    # bold cyan
-      PROMPT) color_tag="$(ui__ansi "$fd" '36;1')" ;;  # bold cyan
-      SYS) color_tag="$(ui__ansi "$fd" '90;1')" ;;     # bold gray
-      TOOL) color_tag="$(ui__ansi "$fd" '38;5;214;1')" ;; # bold orange
-      GIT) color_tag="$(ui__ansi "$fd" '34;1')" ;;     # bold blue
-      GUARD) color_tag="$(ui__ansi "$fd" '33;1')" ;;   # bold yellow
-      *) color_tag="$(ui__ansi "$fd" '1')" ;;
-    esac
-  fi
-
-  if [[ -n "$color_tag" ]]; then
-    printf '%s%s%s %s %s\n' "$color_tag" "$tag" "$reset" "$sep" "$line" >&"$fd"
-  else
-    printf '%s %s %s\n' "$tag" "$sep" "$line" >&"$fd"
-  fi
+  local prefix=""
+  ui__tag_prefix_to "$fd" "$tag" prefix
+  printf '%s%s\n' "$prefix" "$line" >&"$fd"
 }
 
+# Markdown styling codes, built once: ui__md_style_line_to only uses them once
+# it has decided to color, so they need no per-fd check (and no per-line
+# $(ui__ansi) subshells, most of which styled nothing).
+UI__MD_RESET=$'\033[0m'
+UI__MD_BOLD=$'\033[1m'
+UI__MD_DIM=$'\033[2m'
+UI__MD_HEADING=$'\033[38;5;212;1m' # pink-ish bold
+UI__MD_CODE=$'\033[38;5;252m'      # light fg
+UI__MD_CODEBG=$'\033[48;5;234m'    # dark bg
+UI__MD_OK=$'\033[32;1m'
+
 ui__md_style_line_to() {
   # Very lightweight “markdown-ish” styling via ANSI (no external deps).
   # Writes the styled line into a variable (avoids subshells per line).
@@ -357,24 +397,38 @@ ui__md_style_line_to() {
   local out="$line"
 
   if ui__use_color_fd "$fd"; then
-    local reset; reset="$(ui__ansi_reset "$fd")"
-    local bold; bold="$(ui__ansi "$fd" '1')"
-    local dim; dim="$(ui__ansi "$fd" '2')"
-    local h; h="$(ui__ansi "$fd" '38;5;212;1')"         # pink-ish bold
-    local code; code="$(ui__ansi "$fd" '38;5;252')"     # light fg
-    local codebg; codebg="$(ui__ansi "$fd" '48;5;234')" # dark bg
-    local ok; ok="$(ui__ansi "$fd" '32;1')"
+    local reset="$UI__MD_RESET"
+    local bold="$UI__MD_BOLD"
+    local dim="$UI__MD_DIM"
+    local h="$UI__MD_HEADING"
+    local code="$UI__MD_CODE"
+    local codebg="$UI__MD_CODEBG"
+    local ok="$UI__MD_OK"
 
     if [[ "$line" == \`\`\`* ]] || (( in_code == 1 )); then
       out="${codebg}${code}${line}${reset}"
-    elif [[ "$line" =~ ^#{1,6}[[:space:]] ]]; then
-      out="${h}${line}${reset}"
-    elif [[ "$line" == *"<promise>COMPLETE</promise>"* ]]; then
-      out="${ok}${line}${reset}"
-    elif [[ "$line" =~ ^(-|\*|[0-9]+\.)[[:space:]] ]]; then
-      out="${bold}${line}${reset}"
-    elif [[ "$line" =~ ^[-_=]{3,}$ ]]; then
-      out="${dim}${line}${reset}"
+    else
+      # Headings, list items and rules all start with one of these characters.
+      # Other lines (most prose) can only be the completion marker, so they
+      # skip the regex tests (bash compiles a =~ pattern on every evaluation).
+      case "${line:0:1}" in
+        '#'|'-'|'*'|'_'|'='|[0-9])
+          if [[ "$line" =~ ^#{1,6}[[:space:]] ]]; then
+            out="${h}${line}${reset}"
+          elif [[ "$line" == *"<promise>COMPLETE</promise>"* ]]; then
+            out="${ok}${line}${reset}"
+          elif [[ "$line" =~ ^(-|\*|[0-9]+\.)[[:space:]] ]]; then
+            out="${bold}${line}${reset}"
+          elif [[ "$line" =~ ^[-_=]{3,}$ ]]; then
+            out="${dim}${line}${reset}"
+          fi
+          ;;
+        *)
+          if [[ "$line" == *"<promise>COMPLETE</promise>"* ]]; then
+            out="${ok}${line}${reset}"
+          fi
+          ;;
+      esac
     fi
   fi
 
@@ -421,6 +475,47 @@ ui_ai_pretty_stream_fd() {
   done
 }
 
+ui__role_marker_to() {
+  # Normalize a Codex transcript line to a lowercase role marker (user,
+  # assistant, exec, ...) or "" when it is not one. Writes into a variable and
+  # uses builtins only: this runs for every line of agent output, where a
+  # $(trim)/$(lower) pair would cost two subshells plus a `tr` per line.
+  #
+  # Args: line outvar
+  local line="$1"
+  local outvar="$2"
+  local m=""
+
+  m="${line%$'\r'}"
+  m="${m#"${m%%[![:space:]]*}"}"
+  m="${m%"${m##*[![:space:]]}"}"
+  m="${m%:}"
+
+  # Markers are short bare words; longer (trimmed) lines cannot be one.
+  if (( ${#m} > 32 )); then
+    m=""
+  else
+    local restore_nocase="1"
+    shopt -q nocasematch && restore_nocase=""
+    shopt -s nocasematch
+    case "$m" in
+      user) m="user" ;;
+      assistant) m="assistant" ;;
+      codex) m="codex" ;;
+      final) m="final" ;;
+      thinking) m="thinking" ;;
+      analysis) m="analysis" ;;
+      tool) m="tool" ;;
+      exec) m="exec" ;;
+      system) m="system" ;;
+      *) m="" ;;
+    esac
+    [[ -n "$restore_nocase" ]] && shopt -u nocasematch
+  fi
+
+  printf -v "$outvar" '%s' "$m"
+}
+
 ui_codex_pretty_stream_fd() {
   # Improve Codex transcript readability:
   # - Tag lines by role: SYS / PROMPT / THINK / AI / TOOL
@@ -460,15 +555,20 @@ ui_codex_pretty_stream_fd() {
   local src="prompt"
   [[ -n "$prompt_file" ]] && src="$prompt_file"
 
-  local line
+  # Validate the progress interval once rather than on every hidden prompt
+  # line (bash compiles a =~ pattern each time it is evaluated). 0 disables
+  # progress; 10# keeps values like "08" from being read as octal.
+  if [[ "$progress_every" =~ ^[0-9]+$ ]]; then
+    progress_every=$((10#$progress_every))
+  else
+    progress_every=0
+  fi
+
+  local line marker oline
   while IFS= read -r line || [[ -n "$line" ]]; do
     # Role markers in codex transcript are usually bare lines; trim whitespace
     # and accept common suffixes like ":" to be more robust.
-    local marker="$line"
-    marker="${marker%$'\r'}"
-    marker="$(ui__trim_ws "$marker")"
-    marker="${marker%:}"
-    marker="$(ui__lower "$marker")"
+    ui__role_marker_to "$line" marker
 
     case "$marker" in
       user)
@@ -521,8 +621,7 @@ ui_codex_pretty_stream_fd() {
 
     if [[ "$role" == "PROMPT" ]] && [[ -n "$prompt_hide_active" ]]; then
       # Only suppress lines that match the prompt file content.
-      local oline="$line"
-      oline="${oline%$'\r'}"
+      oline="${line%$'\r'}"
 
       # If we already consumed the entire prompt file, stop hiding (the prompt is over).
       if (( prompt_i >= ${#prompt_lines[@]} )); then
@@ -543,7 +642,7 @@ ui_codex_pretty_stream_fd() {
         fi
 
         # Periodically emit progress so long prompts don't look like a hang.
-        if [[ "$progress_every" =~ ^[0-9]+$ ]] && (( progress_every > 0 )) && (( hidden_prompt_lines % progress_every == 0 )); then
+        if (( progress_every > 0 && hidden_prompt_lines % progress_every == 0 )); then
           ui_print_prefixed_fd "$fd" "PROMPT" "[prompt hidden: $src · ${hidden_prompt_lines} lines suppressed]"
         fi
         continue
@@ -584,33 +683,18 @@ ui_tee_prefix_err() {
   # Usage: OUTPUT="$(cmd 2>&1 | ui_tee_prefix_err AI)" ; # OUTPUT contains raw
   local tag="$1"
 
-  local sep; sep="$(ui__pipe_char)"
-
-  local color_tag=""
-  local reset=""
-  if ui__use_color_fd 2; then
-    reset="$(ui__ansi_reset 2)"
-    case "$tag" in
-      AI) color_tag="$(ui__ansi 2 '35;1')" ;;      # bold magenta
-      THINK) color_tag="$(ui__ansi 2 '35;2')" ;;   # dim magenta (if supported)
-      USER) color_tag="$(ui__ansi 2 '36;1')" ;;    # bold cyan
-      PROMPT) color_tag="$(ui__ansi 2 '36;1')" ;;  # bold cyan
-      SYS) color_tag="$(ui__ansi 2 '90;1')" ;;     # bold gray
-      TOOL) color_tag="$(ui__ansi 2 '38;5;214;1')" ;; # bold orange
-      GIT) color_tag="$(ui__ansi 2 '34;1')" ;;     # bold blue
-      GUARD) color_tag="$(ui__ansi 2 '33;1')" ;;   # bold yellow
-      *) color_tag="$(ui__ansi 2 '1')" ;;
-    esac
+  local prefix=""
+  ui__tag_prefix_to 2 "$tag" prefix
+
+  if [[ "$UI__AWK_MODE" != "none" ]]; then
+    ui__awk_stream -v p="$prefix" '{ print; print p $0 > "/dev/stderr"; fflush() }'
+    return 0
   fi
 
   local line
   while IFS= read -r line || [[ -n "$line" ]]; do
     printf '%s\n' "$line"
-    if [[ -n "$color_tag" ]]; then
-      printf '%s%s%s %s %s\n' "$color_tag" "$tag" "$reset" "$sep" "$line" >&2
-    else
-      printf '%s %s %s\n' "$tag" "$sep" "$line" >&2
-    fi
+    printf '%s%s\n' "$prefix" "$line" >&2
   done
 }
 